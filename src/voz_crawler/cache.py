@@ -1,31 +1,91 @@
-"""Simple disk-based HTML cache for crawled pages."""
+"""Simple SQLite-backed HTML cache for crawled pages."""
 
 from __future__ import annotations
 
+import functools
 import hashlib
-import json
+import re
+import sqlite3
+import threading
 import time
+from collections import OrderedDict
 from pathlib import Path
+from typing import Self
+
+import orjson
+import zstandard
 
 from .exceptions import CacheReadError, CacheWriteError
+from .parser import _PARSER_VERSION, PageData, PostData
 
 DEFAULT_CACHE_DIR = Path(".voz_cache")
 DEFAULT_TTL = 0  # seconds; 0 = never expire
+DEFAULT_MEM_MAX = 128  # entries kept in memory; 0 = disk only
+
+_DB_NAME = "cache.sqlite"
+# Bump whenever the ``pages`` table layout or the serialized form of
+# `PageData` changes; caches written with an older layout are dropped and
+# rebuilt on open.
+_SCHEMA_VERSION = 6
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS pages (
+    url_hash BLOB PRIMARY KEY,
+    cached_at REAL NOT NULL,
+    html BLOB NOT NULL,
+    parsed BLOB,
+    parsed_version INTEGER,
+    etag TEXT,
+    last_modified TEXT
+)
+"""
+_ZSTD_LEVEL = 3
+# Entries of the pre-SQLite layout: ``sha256(url).hexdigest()[:16] + ".json"``
+_LEGACY_NAME_RE = re.compile(r"[0-9a-f]{16}\.json")
+
+
+@functools.lru_cache(maxsize=1024)
+def _url_key(url: str) -> bytes:
+    """Return the 8-byte cache key for *url* (non-cryptographic use).
+
+    Memoized: the same URL is typically keyed by ``get`` and then ``put``.
+    """
+    return hashlib.blake2b(url.encode(), digest_size=8).digest()
+
+
+def _page_data_from_json(data: bytes) -> PageData:
+    """Rebuild a `PageData` from its orjson serialization."""
+    raw = orjson.loads(data)
+    raw["posts"] = [PostData(**post) for post in raw["posts"]]
+    return PageData(**raw)
 
 
 class PageCache:
-    """File-system cache keyed by URL.
+    """Two-tier cache keyed by URL: an in-memory LRU in front of SQLite.
 
-    Each entry is stored as a JSON file containing the HTML and metadata.
+    All entries live in one ``cache.sqlite`` database (WAL mode) inside
+    *cache_dir*, so each lookup or store is a single atomic statement on a
+    shared connection; an interrupted write never leaves a torn entry.
+    HTML is stored zstd-compressed.  Each row can also hold the parsed
+    `PageData` for that HTML, so a hit can skip parsing; storing new HTML
+    for a URL drops its parsed copy, and a copy made by another parser
+    version counts as a miss.  Entries stored with an ``ETag`` or
+    ``Last-Modified`` validator are kept after they expire so the caller
+    can revalidate them (see `lookup` and `touch`).  The most recently
+    used entries are also kept in memory, decompressed, so hot pages skip
+    the database entirely.  Both tiers are lock-guarded and may be used
+    from several threads.
 
     Parameters
     ----------
     cache_dir:
-        Directory to store cache files.  Created automatically.
+        Directory to store the cache database.  Created automatically.
     ttl:
         Time-to-live in seconds.  ``0`` means entries never expire.
     enabled:
         Set to ``False`` to disable caching entirely (reads always miss).
+    mem_max:
+        Maximum number of entries held in the in-memory tier.  ``0``
+        disables it.
     """
 
     def __init__(
@@ -34,10 +94,22 @@ class PageCache:
         ttl: int = DEFAULT_TTL,
         *,
         enabled: bool = True,
+        mem_max: int = DEFAULT_MEM_MAX,
     ) -> None:
         self.cache_dir = Path(cache_dir)
         self.ttl = ttl
         self.enabled = enabled
+        self.mem_max = mem_max
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        # Not thread-safe; only used while holding ``self._lock``.
+        self._compressor = zstandard.ZstdCompressor(level=_ZSTD_LEVEL)
+        self._decompressor = zstandard.ZstdDecompressor()
+        # url -> (cached_at, html), least recently used first.  Writes
+        # happen while holding ``self._lock`` (then ``self._mem_lock``) so
+        # the tier always matches the database; reads need only the latter.
+        self._mem: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._mem_lock = threading.Lock()
 
         if self.enabled:
             try:
@@ -46,6 +118,7 @@ class PageCache:
                 raise CacheWriteError(
                     f"Cannot create cache directory {self.cache_dir}: {exc}"
                 ) from exc
+            self._conn = self._connect()
 
     # ------------------------------------------------------------------
     # Public API
@@ -53,65 +126,308 @@ class PageCache:
 
     def get(self, url: str) -> str | None:
         """Return cached HTML for *url*, or ``None`` on miss / expired."""
-        if not self.enabled:
+        return self.lookup(url)[0]
+
+    def lookup(self, url: str) -> tuple[str | None, str | None, str | None]:
+        """Return ``(html, etag, last_modified)`` for *url* in one query.
+
+        *html* is ``None`` on miss / expired, like `get`; the validators are
+        then those stored with the expired entry (see `get_validators`), so
+        the caller can revalidate without a second lookup.  On a hit they
+        are ``None``.
+        """
+        if self._conn is None:
+            return None, None, None
+
+        entry = self._mem_get(url)
+        if entry is not None and not self._is_expired(entry[0]):
+            return entry[1], None, None
+
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT cached_at, html, etag, last_modified FROM pages"
+                    " WHERE url_hash = ?",
+                    (_url_key(url),),
+                ).fetchone()
+                if row is None:
+                    return None, None, None
+                cached_at, data, etag, last_modified = row
+                if not self._is_expired(cached_at):
+                    html = self._decompressor.decompress(data).decode("utf-8")
+                    # Fill the memory tier under the same lock as the read so
+                    # a concurrent ``put`` cannot be overwritten by this row.
+                    self._mem_put(url, (cached_at, html))
+                    return html, None, None
+        except (sqlite3.Error, zstandard.ZstdError, UnicodeDecodeError) as exc:
+            raise CacheReadError(f"Failed to read cache for {url}: {exc}") from exc
+
+        self._expire(url, cached_at)
+        return None, etag, last_modified
+
+    def put(
+        self,
+        url: str,
+        html: str,
+        *,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> None:
+        """Store *html* for *url* in the cache.
+
+        *etag* and *last_modified* are the response's validator headers,
+        used to revalidate the entry once it expires.
+        """
+        if self._conn is None:
+            return
+
+        cached_at = time.time()
+        try:
+            with self._lock:
+                data = self._compressor.compress(html.encode("utf-8"))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO pages"
+                    " (url_hash, cached_at, html, etag, last_modified)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (_url_key(url), cached_at, data, etag, last_modified),
+                )
+                self._mem_put(url, (cached_at, html))
+        except sqlite3.Error as exc:
+            raise CacheWriteError(f"Failed to write cache for {url}: {exc}") from exc
+
+    def get_parsed(self, url: str) -> PageData | None:
+        """Return the cached parsed page for *url*, or ``None`` on miss / expired.
+
+        A page parsed by a different parser version is a miss; its HTML stays
+        cached, so only the parse is redone.
+        """
+        if self._conn is None:
             return None
 
-        path = self._key_path(url)
-        if not path.exists():
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT cached_at, parsed FROM pages"
+                    " WHERE url_hash = ? AND parsed_version = ?",
+                    (_url_key(url), _PARSER_VERSION),
+                ).fetchone()
+                if row is None:
+                    return None
+                data = self._decompressor.decompress(row[1])
+        except (sqlite3.Error, zstandard.ZstdError) as exc:
+            raise CacheReadError(f"Failed to read cache for {url}: {exc}") from exc
+
+        if self._is_expired(row[0]):
+            self._expire(url, row[0])
             return None
 
         try:
-            data = json.loads(path.read_text(encoding="utf-8"))
-        except (json.JSONDecodeError, OSError) as exc:
-            raise CacheReadError(f"Corrupted cache entry for {url}: {exc}") from exc
-
-        # Check TTL
-        if self.ttl > 0:
-            cached_at = data.get("cached_at", 0)
-            if time.time() - cached_at > self.ttl:
-                path.unlink(missing_ok=True)
-                return None
-
-        return data.get("html")
-
-    def put(self, url: str, html: str) -> None:
-        """Store *html* for *url* in the cache."""
-        if not self.enabled:
+            return _page_data_from_json(data)
+        except (orjson.JSONDecodeError, KeyError, TypeError):
+            return None  # written by an incompatible version; re-parse
+
+    def put_parsed(self, url: str, page_data: PageData) -> None:
+        """Attach a parsed page to the cached HTML entry for *url*.
+
+        Does nothing if the HTML for *url* is not cached.
+        """
+        if self._conn is None:
             return
 
-        path = self._key_path(url)
-        payload = {
-            "url": url,
-            "cached_at": time.time(),
-            "html": html,
-        }
+        payload = orjson.dumps(page_data)
         try:
-            path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
-        except OSError as exc:
+            with self._lock:
+                data = self._compressor.compress(payload)
+                self._conn.execute(
+                    "UPDATE pages SET parsed = ?, parsed_version = ?"
+                    " WHERE url_hash = ?",
+                    (data, _PARSER_VERSION, _url_key(url)),
+                )
+        except sqlite3.Error as exc:
+            raise CacheWriteError(f"Failed to write cache for {url}: {exc}") from exc
+
+    def get_validators(self, url: str) -> tuple[str | None, str | None]:
+        """Return the ``(etag, last_modified)`` stored for *url*, even if expired.
+
+        Both are ``None`` when *url* is not cached or was stored without them.
+        """
+        if self._conn is None:
+            return None, None
+
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT etag, last_modified FROM pages WHERE url_hash = ?",
+                    (_url_key(url),),
+                ).fetchone()
+        except sqlite3.Error as exc:
+            raise CacheReadError(f"Failed to read cache for {url}: {exc}") from exc
+        return (None, None) if row is None else row
+
+    def touch(self, url: str) -> str | None:
+        """Mark the entry for *url* as fresh again and return its HTML.
+
+        Used after the server confirmed an expired entry is unchanged (HTTP
+        304); the parsed copy is kept.  Returns ``None`` if *url* is not
+        cached.
+        """
+        if self._conn is None:
+            return None
+
+        cached_at = time.time()
+        try:
+            with self._lock:
+                key = _url_key(url)
+                self._conn.execute(
+                    "UPDATE pages SET cached_at = ? WHERE url_hash = ?",
+                    (cached_at, key),
+                )
+                row = self._conn.execute(
+                    "SELECT html FROM pages WHERE url_hash = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                html = self._decompressor.decompress(row[0]).decode("utf-8")
+                self._mem_put(url, (cached_at, html))
+        except sqlite3.Error as exc:
             raise CacheWriteError(f"Failed to write cache for {url}: {exc}") from exc
+        except (zstandard.ZstdError, UnicodeDecodeError) as exc:
+            raise CacheReadError(f"Failed to read cache for {url}: {exc}") from exc
+        return html
 
     def invalidate(self, url: str) -> bool:
-        """Remove a single cache entry.  Returns ``True`` if it existed."""
-        path = self._key_path(url)
-        if path.exists():
-            path.unlink(missing_ok=True)
-            return True
-        return False
+        """Remove a single cache entry (HTML and parsed page).
+
+        Returns ``True`` if it existed.
+        """
+        if self._conn is None:
+            return False
+
+        try:
+            with self._lock:
+                cursor = self._conn.execute(
+                    "DELETE FROM pages WHERE url_hash = ?", (_url_key(url),)
+                )
+                with self._mem_lock:
+                    self._mem.pop(url, None)
+        except sqlite3.Error as exc:
+            raise CacheWriteError(f"Failed to invalidate {url}: {exc}") from exc
+        return cursor.rowcount > 0
 
     def clear(self) -> int:
-        """Remove **all** cache entries.  Returns the number of files deleted."""
-        if not self.cache_dir.exists():
+        """Remove **all** cache entries.  Returns the number of entries deleted.
+
+        The database file is compacted afterwards, so the disk space is
+        reclaimed.
+        """
+        if self._conn is None:
             return 0
-        count = 0
-        for f in self.cache_dir.glob("*.json"):
-            f.unlink(missing_ok=True)
-            count += 1
+
+        try:
+            with self._lock:
+                count = self._conn.execute("DELETE FROM pages").rowcount
+                with self._mem_lock:
+                    self._mem.clear()
+                # Hand the freed pages back to the filesystem in one go and
+                # truncate the WAL, instead of leaving a large empty file.
+                self._conn.execute("VACUUM")
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as exc:
+            raise CacheWriteError(f"Failed to clear cache: {exc}") from exc
         return count
 
+    def close(self) -> None:
+        """Close the database connection and drop the memory tier.
+
+        Afterwards the cache behaves as if disabled.  Call it once no other
+        thread is using the cache; closing twice is harmless.  The cache
+        is also a context manager that closes itself on exit.
+        """
+        with self._lock:
+            conn, self._conn = self._conn, None
+            with self._mem_lock:
+                self._mem.clear()
+        if conn is not None:
+            conn.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
     # ------------------------------------------------------------------
     # Internals
     # ------------------------------------------------------------------
 
-    def _key_path(self, url: str) -> Path:
-        digest = hashlib.sha256(url.encode()).hexdigest()[:16]
-        return self.cache_dir / f"{digest}.json"
+    def _expire(self, url: str, cached_at: float) -> None:
+        """Drop the entry for *url* only if it is still the one stored at *cached_at*.
+
+        A plain `invalidate` here could delete a fresh entry that another
+        thread wrote between our read and the delete.  Rows carrying an
+        ``ETag`` or ``Last-Modified`` validator stay on disk so they can be
+        revalidated.
+        """
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "DELETE FROM pages WHERE url_hash = ? AND cached_at = ?"
+                    " AND etag IS NULL AND last_modified IS NULL",
+                    (_url_key(url), cached_at),
+                )
+                with self._mem_lock:
+                    entry = self._mem.get(url)
+                    if entry is not None and entry[0] == cached_at:
+                        del self._mem[url]
+        except sqlite3.Error as exc:
+            raise CacheWriteError(f"Failed to expire {url}: {exc}") from exc
+
+    def _is_expired(self, cached_at: float) -> bool:
+        return self.ttl > 0 and time.time() - cached_at > self.ttl
+
+    def _mem_get(self, url: str) -> tuple[float, str] | None:
+        with self._mem_lock:
+            entry = self._mem.get(url)
+            if entry is not None:
+                self._mem.move_to_end(url)
+            return entry
+
+    def _mem_put(self, url: str, entry: tuple[float, str]) -> None:
+        if self.mem_max <= 0:
+            return
+        with self._mem_lock:
+            self._mem[url] = entry
+            self._mem.move_to_end(url)
+            while len(self._mem) > self.mem_max:
+                self._mem.popitem(last=False)
+
+    def _connect(self) -> sqlite3.Connection:
+        path = self.cache_dir / _DB_NAME
+        try:
+            conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            (version,) = conn.execute("PRAGMA user_version").fetchone()
+            if version != _SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS pages")
+                conn.execute(_CREATE_TABLE)
+                conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+                self._remove_legacy_files()
+        except sqlite3.Error as exc:
+            raise CacheWriteError(f"Cannot open cache database {path}: {exc}") from exc
+        return conn
+
+    def _remove_legacy_files(self) -> None:
+        """Delete the ``<digest>.json`` files of the old one-file-per-URL cache.
+
+        Only names that layout could have produced (16 hex digits) are
+        touched; anything else in *cache_dir* is left alone.
+        """
+        try:
+            for path in self.cache_dir.glob("*.json"):
+                if _LEGACY_NAME_RE.fullmatch(path.name):
+                    path.unlink(missing_ok=True)
+        except OSError as exc:
+            raise CacheWriteError(
+                f"Cannot remove old cache files in {self.cache_dir}: {exc}"
+            ) from exc
@@ -2,16 +2,24 @@
 
 from __future__ import annotations
 
+import asyncio
+import functools
 import logging
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import fields
+from operator import attrgetter
 from pathlib import Path
+from typing import Self
 
 import cloudscraper
+import httpx
 import pandas as pd
 from requests.exceptions import ConnectionError, RequestException, Timeout
 
-from .cache import DEFAULT_CACHE_DIR, DEFAULT_TTL, PageCache
+from .cache import DEFAULT_CACHE_DIR, DEFAULT_MEM_MAX, DEFAULT_TTL, PageCache
 from .exceptions import (
     CloudflareBlockedError,
     HTTPError,
@@ -19,7 +27,7 @@ from .exceptions import (
     PageOutOfRangeError,
     ThreadNotFoundError,
 )
-from .parser import PageData, parse_thread_page
+from .parser import PageData, PostData, parse_thread_page
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +35,13 @@ BASE_URL = "https://voz.vn"
 _THREAD_URL_RE = re.compile(
     r"^https?://voz\.vn/t/[\w%-]+\.(\d+)/?",
 )
+_PAGE_SUFFIX_RE = re.compile(r"/page-\d+/?$")
+
+# Column layout for `VozCrawler.pages_to_dataframe`: every `PostData`
+# field, followed by the per-row extras computed while flattening.
+_POST_FIELDS = [f.name for f in fields(PostData)]
+_DATAFRAME_COLUMNS = [*_POST_FIELDS, "page", "image_count", "link_count"]
+_post_values = attrgetter(*_POST_FIELDS)
 
 
 # ---------------------------------------------------------------------------
@@ -34,15 +49,36 @@ _THREAD_URL_RE = re.compile(
 # ---------------------------------------------------------------------------
 
 
+@functools.lru_cache(maxsize=4096)
 def _build_page_url(thread_url: str, page: int) -> str:
     """Append ``/page-N`` to a base thread URL (strip existing page suffix)."""
     # Normalise: remove trailing slash, remove existing /page-N
-    url = re.sub(r"/page-\d+/?$", "", thread_url.rstrip("/"))
+    url = _PAGE_SUFFIX_RE.sub("", thread_url.rstrip("/"))
     if page <= 1:
         return url + "/"
     return f"{url}/page-{page}"
 
 
+def _raise_for_status(status_code: int, url: str) -> None:
+    """Map an HTTP status code to the matching voz-crawler exception."""
+    if status_code == 404:
+        raise ThreadNotFoundError(url)
+    if status_code == 403:
+        raise CloudflareBlockedError(url)
+    if status_code >= 400:
+        raise HTTPError(status_code, url)
+
+
+def _conditional_headers(etag: str | None, last_modified: str | None) -> dict[str, str]:
+    """Build revalidation headers from a cached entry's validators."""
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
 # ---------------------------------------------------------------------------
 # Crawler
 # ---------------------------------------------------------------------------
@@ -59,8 +95,15 @@ class VozCrawler:
         Cache time-to-live in seconds.  ``0`` = never expires.
     cache_enabled:
         Set ``False`` to skip caching entirely.
+    cache_mem_max:
+        Number of pages kept in the in-memory cache tier.  ``0`` = disk only.
     delay:
-        Seconds to sleep between HTTP requests (politeness).
+        Seconds to sleep between HTTP requests (politeness).  Enforced
+        across all worker threads, not per worker.
+    max_workers:
+        Number of threads used by :meth:`crawl_pages` to fetch pages
+        concurrently; also the number of in-flight requests allowed by
+        :meth:`crawl_pages_async`.
     """
 
     def __init__(
@@ -69,30 +112,68 @@ class VozCrawler:
         cache_dir: str | Path = DEFAULT_CACHE_DIR,
         cache_ttl: int = DEFAULT_TTL,
         cache_enabled: bool = True,
+        cache_mem_max: int = DEFAULT_MEM_MAX,
         delay: float = 1.0,
+        max_workers: int = 8,
     ) -> None:
         self._scraper = cloudscraper.create_scraper()
         self._cache = PageCache(
-            cache_dir=cache_dir, ttl=cache_ttl, enabled=cache_enabled
+            cache_dir=cache_dir,
+            ttl=cache_ttl,
+            enabled=cache_enabled,
+            mem_max=cache_mem_max,
         )
         self.delay = delay
-        self._last_request_at: float = 0.0
+        self.max_workers = max_workers
+        self._throttle_lock = threading.Lock()
+        self._next_request_at: float = 0.0
+
+    def close(self) -> None:
+        """Release the HTTP session and the cache database.
+
+        The crawler must not be used afterwards.  It is also a context
+        manager, which calls this on exit.
+        """
+        self._scraper.close()
+        self._cache.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
 
     # ------------------------------------------------------------------
     # Low-level fetch
     # ------------------------------------------------------------------
 
+    def _reserve_request_slot(self) -> float:
+        """Reserve the next request slot; return seconds to wait for it.
+
+        Slots are handed out under a lock, so concurrent workers (threads or
+        tasks) are spaced ``self.delay`` seconds apart.
+        """
+        if self.delay <= 0:
+            return 0.0
+        with self._throttle_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_request_at)
+            self._next_request_at = slot + self.delay
+        return slot - now
+
     def _throttle(self) -> None:
         """Sleep if needed to respect ``self.delay``."""
-        if self.delay <= 0:
-            return
-        elapsed = time.time() - self._last_request_at
-        if elapsed < self.delay:
-            time.sleep(self.delay - elapsed)
+        wait = self._reserve_request_slot()
+        if wait > 0:
+            time.sleep(wait)
 
     def fetch_html(self, url: str, *, use_cache: bool = True) -> str:
         """Fetch the raw HTML for *url*, using cache when available.
 
+        An expired entry that was stored with an ``ETag`` or
+        ``Last-Modified`` header is revalidated with a conditional request;
+        if the server answers 304 the cached HTML is reused and refreshed.
+
         Raises
         ------
         ThreadNotFoundError
@@ -104,34 +185,146 @@ class VozCrawler:
         NetworkError
             For connection / timeout / DNS failures.
         """
+        return self._fetch_html(url, use_cache=use_cache)[0]
+
+    def _fetch_html(self, url: str, *, use_cache: bool = True) -> tuple[str, bool]:
+        """Implement `fetch_html`; the flag is ``True`` for a 304-revalidated hit."""
         # Try cache first
+        headers = {}
         if use_cache:
-            cached = self._cache.get(url)
+            cached, etag, last_modified = self._cache.lookup(url)
             if cached is not None:
                 logger.debug("Cache HIT for %s", url)
-                return cached
+                return cached, False
+            headers = _conditional_headers(etag, last_modified)
 
         # Fetch from network
         self._throttle()
         try:
-            response = self._scraper.get(url, timeout=30)
-            self._last_request_at = time.time()
+            response = self._scraper.get(url, timeout=30, headers=headers)
         except (Timeout, ConnectionError) as exc:
             raise NetworkError(f"Connection failed for {url}: {exc}") from exc
         except RequestException as exc:
             raise NetworkError(f"Request error for {url}: {exc}") from exc
 
-        # Handle status codes
-        if response.status_code == 404:
-            raise ThreadNotFoundError(url)
-        if response.status_code == 403:
-            raise CloudflareBlockedError(url)
-        if response.status_code >= 400:
-            raise HTTPError(response.status_code, url)
+        if response.status_code == 304:
+            html = self._cache.touch(url)
+            if html is not None:
+                logger.debug("Cache REVALIDATED for %s", url)
+                return html, True
+            # Entry dropped since we read its validators; fetch it in full
+            return self._fetch_html(url, use_cache=False)
+
+        _raise_for_status(response.status_code, url)
+
+        html = response.text
+        self._cache.put(
+            url,
+            html,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+        return html, False
+
+    async def _fetch_html_async(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        semaphore: asyncio.Semaphore,
+        *,
+        use_cache: bool = True,
+    ) -> tuple[str, bool]:
+        """Async counterpart of :meth:`_fetch_html` on a shared httpx client."""
+        headers = {}
+        if use_cache:
+            cached, etag, last_modified = await asyncio.to_thread(
+                self._cache.lookup, url
+            )
+            if cached is not None:
+                logger.debug("Cache HIT for %s", url)
+                return cached, False
+            headers = _conditional_headers(etag, last_modified)
+
+        async with semaphore:
+            wait = self._reserve_request_slot()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                response = await client.get(url, headers=headers)
+            except (httpx.TimeoutException, httpx.NetworkError) as exc:
+                raise NetworkError(f"Connection failed for {url}: {exc}") from exc
+            except httpx.HTTPError as exc:
+                raise NetworkError(f"Request error for {url}: {exc}") from exc
+
+        if response.status_code == 304:
+            html = await asyncio.to_thread(self._cache.touch, url)
+            if html is not None:
+                logger.debug("Cache REVALIDATED for %s", url)
+                return html, True
+            return await self._fetch_html_async(client, url, semaphore, use_cache=False)
+
+        _raise_for_status(response.status_code, url)
 
         html = response.text
-        self._cache.put(url, html)
-        return html
+        await asyncio.to_thread(
+            self._cache.put,
+            url,
+            html,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+        return html, False
+
+    def _load_page(self, url: str) -> PageData:
+        """Return parsed data for page *url*, skipping parsing on a cache hit."""
+        page_data = self._cache.get_parsed(url)
+        if page_data is not None:
+            logger.debug("Parsed cache HIT for %s", url)
+            return page_data
+
+        return self._parse_and_store(url, *self._fetch_html(url))
+
+    def _parse_and_store(self, url: str, html: str, revalidated: bool) -> PageData:
+        """Parse freshly fetched *html* for *url* and cache the result."""
+        # A 304 revalidation keeps the parsed copy; reuse it if present
+        page_data = self._cache.get_parsed(url) if revalidated else None
+        if page_data is None:
+            page_data = parse_thread_page(html, thread_url=url)
+            self._cache.put_parsed(url, page_data)
+        return page_data
+
+    async def _load_page_async(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        semaphore: asyncio.Semaphore,
+    ) -> PageData:
+        """Async counterpart of :meth:`_load_page`.
+
+        Parsing and cache I/O are blocking, so they run in worker threads
+        and the event loop keeps reading other responses meanwhile.
+        """
+        page_data = await asyncio.to_thread(self._cache.get_parsed, url)
+        if page_data is not None:
+            logger.debug("Parsed cache HIT for %s", url)
+            return page_data
+
+        html, revalidated = await self._fetch_html_async(client, url, semaphore)
+        return await asyncio.to_thread(self._parse_and_store, url, html, revalidated)
+
+    def _async_client(self) -> httpx.AsyncClient:
+        """Build an HTTP/2 client that reuses the scraper's headers and cookies.
+
+        Cloudflare clearance cookies are tied to the User-Agent, so both are
+        copied from the cloudscraper session.
+        """
+        return httpx.AsyncClient(
+            http2=True,
+            headers=dict(self._scraper.headers),
+            cookies=self._scraper.cookies,
+            timeout=30,
+            follow_redirects=True,
+        )
 
     # ------------------------------------------------------------------
     # Page-level crawling
@@ -158,8 +351,7 @@ class VozCrawler:
             If *page* exceeds the thread's page count.
         """
         url = _build_page_url(thread_url, page)
-        html = self.fetch_html(url)
-        page_data = parse_thread_page(html, thread_url=url)
+        page_data = self._load_page(url)
 
         # Validate page range — Voz silently redirects to last page if
         # the requested page is too high, so we compare:
@@ -176,6 +368,10 @@ class VozCrawler:
     ) -> list[PageData]:
         """Crawl a range of pages and return them as a list.
 
+        The first page is fetched on its own to discover the page count;
+        the remaining pages are fetched concurrently with up to
+        ``max_workers`` threads and returned in page order.
+
         Parameters
         ----------
         thread_url:
@@ -198,9 +394,48 @@ class VozCrawler:
         if last > first.total_pages:
             last = first.total_pages
 
-        for p in range(start_page + 1, last + 1):
-            page_data = self.crawl_page(thread_url, p)
-            results.append(page_data)
+        urls = [_build_page_url(thread_url, p) for p in range(start_page + 1, last + 1)]
+        if not urls:
+            return results
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results.extend(executor.map(self._load_page, urls))
+
+        return results
+
+    async def crawl_pages_async(
+        self,
+        thread_url: str,
+        start_page: int = 1,
+        end_page: int | None = None,
+    ) -> list[PageData]:
+        """Async variant of :meth:`crawl_pages` over one HTTP/2 connection.
+
+        The first page goes through the cloudscraper session (in a worker
+        thread) so any Cloudflare challenge is solved there; the remaining
+        pages are then multiplexed over a single ``httpx.AsyncClient`` that
+        carries the resulting cookies.  At most ``max_workers`` requests are
+        in flight and ``delay`` is still honoured between request starts.
+
+        Parameters and return value are the same as :meth:`crawl_pages`.
+        """
+        first = await asyncio.to_thread(self.crawl_page, thread_url, start_page)
+        results: list[PageData] = [first]
+
+        last = end_page if end_page is not None else first.total_pages
+        last = min(last, first.total_pages)
+
+        urls = [_build_page_url(thread_url, p) for p in range(start_page + 1, last + 1)]
+        if not urls:
+            return results
+
+        semaphore = asyncio.Semaphore(self.max_workers)
+        async with self._async_client() as client:
+            results.extend(
+                await asyncio.gather(
+                    *(self._load_page_async(client, url, semaphore) for url in urls)
+                )
+            )
 
         return results
 
@@ -211,20 +446,23 @@ class VozCrawler:
     @staticmethod
     def pages_to_dataframe(pages: list[PageData]) -> pd.DataFrame:
         """Flatten a list of `PageData` into a single DataFrame."""
-        from dataclasses import asdict
-
-        records = []
-        for page in pages:
-            for post in page.posts:
-                row = asdict(post)
-                row["page"] = page.current_page
-                records.append(row)
+        records = (
+            (
+                *_post_values(post),
+                page.current_page,
+                len(post.images),
+                len(post.links),
+            )
+            for page in pages
+            for post in page.posts
+        )
 
-        df = pd.DataFrame(records)
+        df = pd.DataFrame.from_records(records, columns=_DATAFRAME_COLUMNS)
+        df = df.astype({"image_count": "int32", "link_count": "int32"})
         if not df.empty:
-            df["datetime"] = pd.to_datetime(df["datetime"], errors="coerce")
-            df["image_count"] = df["images"].apply(len)
-            df["link_count"] = df["links"].apply(len)
+            df["datetime"] = pd.to_datetime(
+                df["datetime"], format="ISO8601", errors="coerce"
+            )
         return df
 
     # ------------------------------------------------------------------
@@ -232,10 +470,10 @@ class VozCrawler:
     # ------------------------------------------------------------------
 
     def clear_cache(self) -> int:
-        """Remove all cached entries.  Returns count of deleted files."""
+        """Remove all cached entries.  Returns count of deleted entries."""
         return self._cache.clear()
 
     def invalidate_page(self, thread_url: str, page: int = 1) -> bool:
-        """Invalidate the cache for a specific page."""
+        """Invalidate the cache (HTML and parsed data) for a specific page."""
         url = _build_page_url(thread_url, page)
         return self._cache.invalidate(url)
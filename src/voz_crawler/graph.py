@@ -3,14 +3,19 @@
 from __future__ import annotations
 
 import re
-from collections import Counter
+from collections import Counter, defaultdict
 from dataclasses import dataclass
+from heapq import nlargest
+from operator import itemgetter
 
 import networkx as nx
 import pandas as pd
 
 
-_QUOTE_RE = re.compile(r'<quote\s+author="([^"]+)"(?:\s+post_id="(\d+)")?>')
+_QUOTE_RE = re.compile(
+    r'<quote\s+author="(?P<quoted_author>[^"]+)"'
+    r'(?:\s+post_id="(?P<quoted_post_id>\d+)")?>'
+)
 
 
 # ---------------------------------------------------------------------------
@@ -63,26 +68,38 @@ def extract_reply_edges(
     list[ReplyEdge]
         Directed edges from the replying post to the quoted post.
     """
-    post_user_map: dict[str, str] = {}
-    for _, row in df.iterrows():
-        post_user_map[str(row["post_id"])] = row["username"]
-
-    edges: list[ReplyEdge] = []
-    for _, row in df.iterrows():
-        quotes = _QUOTE_RE.findall(row["content_text"])
-        for quoted_author, quoted_post_id in quotes:
-            if exclude_self_quotes and quoted_author == row["username"]:
-                continue
-            if quoted_post_id and quoted_post_id in post_user_map:
-                edges.append(
-                    ReplyEdge(
-                        from_post_id=str(row["post_id"]),
-                        from_username=row["username"],
-                        to_post_id=quoted_post_id,
-                        to_username=quoted_author,
-                    )
-                )
-    return edges
+    if df.empty:
+        return []
+
+    post_ids = df["post_id"].astype(str).to_numpy()
+    usernames = df["username"].to_numpy()
+
+    # One row per ``<quote>`` match; index level 0 is the source row position.
+    matches = df["content_text"].reset_index(drop=True).str.extractall(_QUOTE_RE)
+    if matches.empty:
+        return []
+    rows = matches.index.get_level_values(0).to_numpy()
+    from_post_ids = post_ids[rows]
+    from_usernames = usernames[rows]
+
+    mask = matches["quoted_post_id"].isin(set(post_ids)).to_numpy()
+    if exclude_self_quotes:
+        mask = mask & (matches["quoted_author"] != from_usernames).to_numpy()
+
+    return [
+        ReplyEdge(
+            from_post_id=from_post_id,
+            from_username=from_username,
+            to_post_id=to_post_id,
+            to_username=to_username,
+        )
+        for from_post_id, from_username, to_post_id, to_username in zip(
+            from_post_ids[mask],
+            from_usernames[mask],
+            matches["quoted_post_id"].to_numpy()[mask],
+            matches["quoted_author"].to_numpy()[mask],
+        )
+    ]
 
 
 def edges_to_dataframe(edges: list[ReplyEdge]) -> pd.DataFrame:
@@ -117,18 +134,33 @@ def build_reply_graph(
         ``page`` attributes.  Each edge represents a quote/reply.
     """
     G = nx.DiGraph()
+    if df.empty:
+        return G
 
-    for _, row in df.iterrows():
-        pid = str(row["post_id"])
-        G.add_node(pid, username=row["username"], page=int(row["page"]))
+    post_ids = df["post_id"].astype(str).tolist()
+    G.add_nodes_from(
+        (pid, {"username": username, "page": int(page)})
+        for pid, username, page in zip(post_ids, df["username"], df["page"])
+    )
 
-    for edge in edges:
-        if G.has_node(edge.from_post_id) and G.has_node(edge.to_post_id):
-            G.add_edge(edge.from_post_id, edge.to_post_id)
+    nodes = set(post_ids)
+    G.add_edges_from(
+        (e.from_post_id, e.to_post_id)
+        for e in edges
+        if e.from_post_id in nodes and e.to_post_id in nodes
+    )
 
     return G
 
 
+def _sum_by_user(degrees: dict[str, int], usernames: dict[str, str]) -> Counter[str]:
+    """Sum per-post *degrees* into per-username totals."""
+    totals: defaultdict[str, int] = defaultdict(int)
+    for pid, cnt in degrees.items():
+        totals[usernames.get(pid, "?")] += cnt
+    return Counter(totals)
+
+
 def compute_graph_stats(G: nx.DiGraph, *, top_n: int = 10) -> GraphStats:
     """Compute summary statistics for a reply graph.
 
@@ -141,22 +173,18 @@ def compute_graph_stats(G: nx.DiGraph, *, top_n: int = 10) -> GraphStats:
     """
     in_deg = dict(G.in_degree())
     out_deg = dict(G.out_degree())
+    usernames = nx.get_node_attributes(G, "username")
 
-    # Top quoted posts
-    sorted_posts = sorted(in_deg.items(), key=lambda x: x[1], reverse=True)
+    # Top quoted posts: O(N log top_n) selection instead of a full sort
+    quoted_posts = ((pid, cnt) for pid, cnt in in_deg.items() if cnt > 0)
     top_quoted_posts = [
-        (pid, G.nodes[pid].get("username", "?"), cnt)
-        for pid, cnt in sorted_posts[:top_n]
-        if cnt > 0
+        (pid, usernames.get(pid, "?"), cnt)
+        for pid, cnt in nlargest(top_n, quoted_posts, key=itemgetter(1))
     ]
 
     # Aggregate by user
-    user_quoted: Counter[str] = Counter()
-    user_replies: Counter[str] = Counter()
-    for pid, cnt in in_deg.items():
-        user_quoted[G.nodes[pid].get("username", "?")] += cnt
-    for pid, cnt in out_deg.items():
-        user_replies[G.nodes[pid].get("username", "?")] += cnt
+    user_quoted = _sum_by_user(in_deg, usernames)
+    user_replies = _sum_by_user(out_deg, usernames)
 
     return GraphStats(
         num_nodes=G.number_of_nodes(),
@@ -172,6 +200,22 @@ def compute_graph_stats(G: nx.DiGraph, *, top_n: int = 10) -> GraphStats:
 # ---------------------------------------------------------------------------
 
 
+def _layout(H: nx.DiGraph, *, seed: int) -> dict[str, tuple[float, float]]:
+    """Return node positions for *H*, preferring ForceAtlas2 if available."""
+    try:
+        from fa2_modified import ForceAtlas2
+    except ImportError:
+        return nx.spring_layout(H, k=1.8, iterations=80, seed=seed)
+
+    # ForceAtlas2 needs a symmetric adjacency matrix and picks unseeded
+    # random start positions, so give it both.
+    return ForceAtlas2(verbose=False).forceatlas2_networkx_layout(
+        H.to_undirected(as_view=True),
+        pos=nx.random_layout(H, seed=seed),
+        iterations=80,
+    )
+
+
 def plot_reply_graph(
     G: nx.DiGraph,
     *,
@@ -196,7 +240,14 @@ def plot_reply_graph(
     top_n_legend:
         Number of top users to show in the legend.
     seed:
-        Random seed for the spring layout.
+        Random seed for the layout.
+
+    Notes
+    -----
+    Uses the Barnes-Hut ForceAtlas2 layout from ``fa2_modified`` when it is
+    installed (``pip install fa2_modified``), which is much faster than
+    ``nx.spring_layout`` on large threads; falls back to the spring layout
+    otherwise.
     """
     import matplotlib
     import matplotlib.pyplot as plt
@@ -218,20 +269,23 @@ def plot_reply_graph(
     fig, ax = plt.subplots(figsize=figsize)
     ax.set_title(title, fontsize=18, fontweight="bold", pad=20)
 
-    # Colour by user
-    usernames = sorted(set(nx.get_node_attributes(H, "username").values()))
-    user_color_map = {u: i for i, u in enumerate(usernames)}
+    # Read node attributes once instead of going through the node view
+    node_list = list(H.nodes())
+    usernames_by_node = nx.get_node_attributes(H, "username")
+    in_deg = dict(H.in_degree())
+
+    # Colour by user: one integer code per username, in sorted order
+    codes, users = pd.factorize(
+        pd.Series([usernames_by_node[n] for n in node_list]), sort=True
+    )
     cmap = plt.cm.tab20
-    node_colors = [
-        cmap(user_color_map[H.nodes[n]["username"]] % 20) for n in H.nodes()
-    ]
+    node_colors = cmap(codes % 20)
 
     # Size by in-degree
-    in_deg = dict(H.in_degree())
-    node_sizes = [in_deg[n] * 200 + 80 for n in H.nodes()]
+    node_sizes = [in_deg[n] * 200 + 80 for n in node_list]
 
     # Layout
-    pos = nx.spring_layout(H, k=1.8, iterations=80, seed=seed)
+    pos = _layout(H, seed=seed)
 
     # Edges
     nx.draw_networkx_edges(
@@ -251,6 +305,7 @@ def plot_reply_graph(
         H,
         pos,
         ax=ax,
+        nodelist=node_list,
         node_size=node_sizes,
         node_color=node_colors,
         alpha=0.85,
@@ -259,35 +314,33 @@ def plot_reply_graph(
     )
 
     # Labels
-    labels: dict[str, str] = {}
-    for n in H.nodes():
-        if in_deg[n] >= min_degree_label:
-            labels[n] = f"{H.nodes[n]['username']}\n#{n}"
-        elif in_deg[n] >= 1:
-            labels[n] = f"#{n}"
+    labels = {
+        n: f"{usernames_by_node[n]}\n#{n}" if in_deg[n] >= min_degree_label else f"#{n}"
+        for n in node_list
+        if in_deg[n] >= 1 or in_deg[n] >= min_degree_label
+    }
     nx.draw_networkx_labels(
         H, pos, labels=labels, ax=ax, font_size=6, font_weight="bold"
     )
 
     # Legend – aggregate quotes per user
     user_quoted: Counter[str] = Counter()
-    for pid in H.nodes():
-        user_quoted[H.nodes[pid]["username"]] += in_deg[pid]
+    for pid in node_list:
+        user_quoted[usernames_by_node[pid]] += in_deg[pid]
     legend_elements = []
     for user, cnt in user_quoted.most_common(top_n_legend):
-        if user in user_color_map:
-            color = cmap(user_color_map[user] % 20)
-            legend_elements.append(
-                Line2D(
-                    [0],
-                    [0],
-                    marker="o",
-                    color="w",
-                    markerfacecolor=color,
-                    markersize=8,
-                    label=f"{user} ({cnt})",
-                )
+        color = cmap(users.get_loc(user) % 20)
+        legend_elements.append(
+            Line2D(
+                [0],
+                [0],
+                marker="o",
+                color="w",
+                markerfacecolor=color,
+                markersize=8,
+                label=f"{user} ({cnt})",
             )
+        )
     if legend_elements:
         ax.legend(
             handles=legend_elements,
@@ -2,15 +2,25 @@
 
 from __future__ import annotations
 
+import copy
 import re
+import sys
+import threading
 import unicodedata
 from dataclasses import dataclass, field
 
+import lxml.html
+from lxml import etree
 from parsel import Selector
+from parsel.csstranslator import HTMLTranslator
 
 from .exceptions import PageParsingError
 
 BASE_URL = "https://voz.vn"
+# Bump whenever a change alters the `PageData` produced for the same HTML;
+# parsed pages cached by an older version are then re-parsed on next use.
+# 2: an inner quote repeated in two outer quotes no longer hijacks the second.
+_PARSER_VERSION = 2
 
 
 # ---------------------------------------------------------------------------
@@ -18,7 +28,7 @@ BASE_URL = "https://voz.vn"
 # ---------------------------------------------------------------------------
 
 
-@dataclass
+@dataclass(slots=True)
 class PostData:
     """Parsed data for a single forum post."""
 
@@ -40,7 +50,7 @@ class PostData:
     reaction_count: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class PageData:
     """Parse result for one page of a thread."""
 
@@ -55,140 +65,257 @@ class PageData:
 # ---------------------------------------------------------------------------
 
 
+_NL_RE = re.compile(r"\n{3,}")
+
+
+def _collapse_spaces(line: str) -> str:
+    """Collapse each whitespace run in *line* to one space (keeps edge spaces)."""
+    words = line.split()
+    if not words:
+        return " " if line else ""
+    collapsed = " ".join(words)
+    if line[0].isspace():
+        collapsed = " " + collapsed
+    if line[-1].isspace():
+        collapsed += " "
+    return collapsed
+
+
 def normalize_text(text: str) -> str:
     """Chuẩn hoá Unicode NFC, collapse whitespace, trim."""
-    text = unicodedata.normalize("NFC", text)
-    text = re.sub(r"[^\S\n]+", " ", text)
-    text = re.sub(r"\n{3,}", "\n\n", text)
+    # Quick checks first: Voz text is almost always NFC already, and
+    # normalize() would still copy it.  ASCII is always NFC, and isascii()
+    # is O(1) on CPython strings.
+    if not text.isascii() and not unicodedata.is_normalized("NFC", text):
+        text = unicodedata.normalize("NFC", text)
+    # str.split() collapses whitespace in C, much cheaper than a regex pass
+    text = "\n".join([_collapse_spaces(line) for line in text.split("\n")])
+    text = _NL_RE.sub("\n\n", text)
     return text.strip()
 
 
 # ---------------------------------------------------------------------------
-# Post-level parsing
+# Compiled selectors
 # ---------------------------------------------------------------------------
 
-_POST_ID_RE = re.compile(r"post:\s*(\d+)")
-_USER_ID_RE = re.compile(r"\.(\d+)/?$")
-_OTHERS_RE = re.compile(r"(\d+)\s+others?")
+_CSS_TRANSLATOR = HTMLTranslator()
 
 
-def _extract_content_with_quotes(article: Selector) -> str:
-    """Extract post body text, wrapping quotes in ``<quote>`` tags."""
+def _css(query: str) -> etree.XPath:
+    """Compile a parsel-style CSS *query* (``::text`` / ``::attr()`` allowed).
 
-    body = article.css(".message-body .bbWrapper")
-    if not body:
-        return ""
+    Translating and compiling once at import time saves ``Selector.css``
+    from redoing it on every call; the compiled XPath is applied to lxml
+    elements directly.
+    """
+    return etree.XPath(_CSS_TRANSLATOR.css_to_xpath(query), smart_strings=False)
+
+
+_ARTICLES = _css("article.message")
+_POST_URL = _css("header.message-attribution a[href*=post-]::attr(href)")
+_TIME = _css("time.u-dt")
+_USER_LINK = _css("a.username::attr(href)")
+_USER_TITLE = _css(".userTitle::text")
+_USER_BANNER = _css(".userBanner span::text")
+_AVATAR_IMG = _css(".message-avatar img")
+_BODY = _css(".message-body .bbWrapper")
+_QUOTE_BLOCK = _CSS_TRANSLATOR.css_to_xpath(".bbCodeBlock--quote", prefix="")
+_TOP_LEVEL_QUOTES = etree.XPath(
+    f"descendant-or-self::{_QUOTE_BLOCK}[not(ancestor::{_QUOTE_BLOCK})]"
+)
+_QUOTE_EXPAND_CONTENT = _css(".bbCodeBlock-expandContent")
+_QUOTE_CONTENT = _css(".bbCodeBlock-content")
+# Images minus emoji / reactions, and links with an href: filtered in libxml2
+_IMAGE_SRCS = _css(
+    'img[src]:not([src=""]):not([src*=smilies]):not([src*=reactions])::attr(src)'
+)
+_LINK_HREFS = _css('a.link[href]:not([href=""])::attr(href)')
+_REACTIONS_BAR = _css(".reactionsBar")
+_REACTION_IMAGES = _css(".reaction img")
+_REACTIONS_LINK_TEXT = _css(".reactionsBar-link::text")
+_REACTIONS_USERS = _css(".reactionsBar-link bdi::text")
+_TEXT = _css("::text")
+_PAGE_NAV = _css("ul.pageNav-main")
+
+
+def _first_match(query: str) -> str:
+    """XPath string expression: text of the first *query* match, or ``""``."""
+    return f"string(({_CSS_TRANSLATOR.css_to_xpath(query)})[1])"
+
+
+# Current and last page labels of one pagination bar in a single
+# evaluation, packed as "<len(current)>:<current><last>" so that either
+# label may contain any text.
+_PAGE_LABELS = etree.XPath(
+    "concat(string-length({current}), ':', {current}, {last})".format(
+        current=_first_match("li.pageNav-page--current a::text"),
+        last=_first_match("li:last-child a::text"),
+    ),
+    smart_strings=False,
+)
+
+
+def _first(values: list, default=""):
+    """Return the first query result, or *default* if there is none."""
+    return values[0] if values else default
+
+
+def _select_all(xpath: etree.XPath, nodes: list[etree._Element]) -> list:
+    """Apply *xpath* to every node in *nodes* and flatten the results."""
+    return [result for node in nodes for result in xpath(node)]
+
+
+def _to_html(element: etree._Element) -> str:
+    """Serialize *element* the way ``Selector.get()`` does."""
+    return etree.tostring(element, method="html", encoding="unicode", with_tail=False)
 
-    quote_blocks = article.css(".bbCodeBlock--quote")
-    replacements: list[str] = []
 
-    for idx, qb in enumerate(quote_blocks):
-        author = qb.attrib.get("data-quote", "").strip()
-        source_raw = qb.attrib.get("data-source", "")
-        quote_post_id = ""
-        m = _POST_ID_RE.search(source_raw)
-        if m:
-            quote_post_id = m.group(1)
+# ---------------------------------------------------------------------------
+# Post-level parsing
+# ---------------------------------------------------------------------------
 
-        content = qb.css(".bbCodeBlock-expandContent") or qb.css(
-            ".bbCodeBlock-content"
-        )
-        quote_text = (
-            normalize_text(" ".join(content.css("::text").getall()))
-            if content
-            else ""
-        )
+_USER_ID_RE = re.compile(r"\.(\d+)/?$")
+_OTHERS_RE = re.compile(r"(\d+)\s+others?")
 
-        attrs: list[str] = []
-        if author:
-            attrs.append(f'author="{author}"')
-        if quote_post_id:
-            attrs.append(f'post_id="{quote_post_id}"')
-        attr_str = (" " + " ".join(attrs)) if attrs else ""
-        replacements.append(f"<quote{attr_str}>{quote_text}</quote>")
-
-    # Replace quote block HTML with placeholders, then extract text
-    modified_html = body.get("")
-    for idx, qb in enumerate(quote_blocks):
-        modified_html = modified_html.replace(
-            qb.get(), f"__QUOTE_PLACEHOLDER_{idx}__"
-        )
 
-    raw_text = " ".join(Selector(text=modified_html).css("::text").getall())
+def _find_post_id(source: str) -> str:
+    r"""Return the digits after ``post:`` in a quote's *source*, or ``""``.
 
-    for idx, replacement in enumerate(replacements):
-        raw_text = raw_text.replace(
-            f"__QUOTE_PLACEHOLDER_{idx}__", "\n" + replacement + "\n"
-        )
+    Same result as ``re.search(r"post:\s*(\d+)", source)``, but the usual
+    ``"post: 123"`` is resolved with two string methods and no regex.
+    """
+    start = source.find("post:")
+    while start != -1:
+        rest = source[start + 5 :].lstrip()
+        if rest.isdecimal():
+            return rest
+        end = 0
+        while end < len(rest) and rest[end].isdecimal():
+            end += 1
+        if end:
+            return rest[:end]
+        start = source.find("post:", start + 1)
+    return ""
+
+
+def _format_quote(qb: etree._Element) -> str:
+    """Render one quote block as ``<quote author=".." post_id="..">text</quote>``."""
+    author = qb.get("data-quote", "").strip()
+    quote_post_id = _find_post_id(qb.get("data-source", ""))
+
+    content = _QUOTE_EXPAND_CONTENT(qb) or _QUOTE_CONTENT(qb)
+    quote_text = (
+        normalize_text(" ".join(_select_all(_TEXT, content))) if content else ""
+    )
 
-    return normalize_text(raw_text)
+    attrs: list[str] = []
+    if author:
+        attrs.append(f'author="{author}"')
+    if quote_post_id:
+        attrs.append(f'post_id="{quote_post_id}"')
+    attr_str = (" " + " ".join(attrs)) if attrs else ""
+    return f"<quote{attr_str}>{quote_text}</quote>"
+
+
+def _replace_with_text(element: etree._Element, text: str) -> None:
+    """Replace *element* in its tree by *text*, keeping its tail in place.
+
+    The text is merged into the neighbouring text node rather than wrapped
+    in a new element, so text extraction sees one node, not three.
+    """
+    text += element.tail or ""
+    parent = element.getparent()
+    previous = element.getprevious()
+    if previous is not None:
+        previous.tail = (previous.tail or "") + text
+    else:
+        parent.text = (parent.text or "") + text
+    parent.remove(element)
+
+
+def _child_path(root: etree._Element, element: etree._Element) -> list[int]:
+    """Return the child indexes leading from *root* down to *element*."""
+    path = []
+    while element is not root:
+        parent = element.getparent()
+        path.append(parent.index(element))
+        element = parent
+    path.reverse()
+    return path
+
+
+def _extract_content_with_quotes(body: etree._Element) -> str:
+    """Extract post *body* text, wrapping quotes in ``<quote>`` tags."""
+
+    quotes = _TOP_LEVEL_QUOTES(body)
+    if quotes:
+        # Swap each outermost quote block for its ``<quote>`` text in a copy
+        # of the body (the original is still serialized for
+        # ``content_html``); nested quotes are rendered as part of their
+        # parent's text.  Going backwards keeps earlier paths valid.
+        paths = [_child_path(body, qb) for qb in quotes]
+        body = copy.deepcopy(body)
+        for qb, path in zip(reversed(quotes), reversed(paths)):
+            target = body
+            for index in path:
+                target = target[index]
+            _replace_with_text(target, "\n" + _format_quote(qb) + "\n")
+
+    # Not tostring(method="text"): it is faster, but glues text nodes
+    # together with no separator, merging words across <p>, <li> or <div>
+    # boundaries that have no whitespace between them.
+    return normalize_text(" ".join(_TEXT(body)))
 
 
 def parse_post(article: Selector) -> PostData:
     """Parse a single ``<article class="message">`` into a `PostData`."""
+    return _parse_post(article.root)
+
 
-    post_id = article.attrib.get("data-content", "").replace("post-", "")
-    post_url_path = article.css(
-        "header.message-attribution a[href*=post-]::attr(href)"
-    ).get("")
+def _parse_post(article: etree._Element) -> PostData:
+    post_id = article.get("data-content", "").replace("post-", "")
+    post_url_path = _first(_POST_URL(article))
     post_url = BASE_URL + post_url_path if post_url_path else ""
 
     # Time
-    time_el = article.css("time.u-dt")
-    post_datetime = time_el.attrib.get("datetime", "") if time_el else ""
-    post_timestamp = int(time_el.attrib.get("data-timestamp", 0)) if time_el else 0
-
-    # User
-    username = article.attrib.get("data-author", "")
-    user_link = article.css("a.username::attr(href)").get("")
+    time_el = _first(_TIME(article), None)
+    post_datetime = time_el.get("datetime", "") if time_el is not None else ""
+    post_timestamp = int(time_el.get("data-timestamp", 0)) if time_el is not None else 0
+
+    # User; the same few names, titles and reaction types repeat across a
+    # thread, so intern them to share one string object per value
+    username = sys.intern(article.get("data-author", ""))
+    user_link = _first(_USER_LINK(article))
     uid_match = _USER_ID_RE.search(user_link)
     user_id = int(uid_match.group(1)) if uid_match else None
     user_url = BASE_URL + user_link if user_link else ""
-    user_title = article.css(".userTitle::text").get("").strip()
-
-    avatar_img = article.css(".message-avatar img")
-    avatar_url = avatar_img.attrib.get("src", "") if avatar_img else ""
-
-    user_banner = article.css(".userBanner span::text").get("")
-
-    # Content
-    content_text = _extract_content_with_quotes(article)
-    body = article.css(".message-body .bbWrapper")
-    content_html = body.get("") if body else ""
-
-    # Images (skip emoji / reactions)
-    images = [
-        img.attrib.get("src", "")
-        for img in (body.css("img") if body else [])
-        if img.attrib.get("src", "")
-        and "smilies" not in img.attrib["src"]
-        and "reactions" not in img.attrib["src"]
-    ]
-
-    # Links
-    links = [
-        a.attrib["href"]
-        for a in (body.css("a.link") if body else [])
-        if a.attrib.get("href")
-    ]
+    user_title = sys.intern(_first(_USER_TITLE(article)).strip())
+
+    avatar_img = _first(_AVATAR_IMG(article), None)
+    avatar_url = avatar_img.get("src", "") if avatar_img is not None else ""
+
+    user_banner = _first(_USER_BANNER(article))
+
+    # Content; a post can have several matching wrappers, the first is the body
+    bodies = _BODY(article)
+    content_text = _extract_content_with_quotes(bodies[0]) if bodies else ""
+    content_html = _to_html(bodies[0]) if bodies else ""
+
+    images = _select_all(_IMAGE_SRCS, bodies)
+    links = _select_all(_LINK_HREFS, bodies)
 
     # Reactions
     reaction_types: list[str] = []
-    reaction_bar = article.css(".reactionsBar")
-    if reaction_bar:
-        for react in reaction_bar.css(".reaction img"):
-            rtype = react.attrib.get("alt", "") or react.attrib.get("title", "")
-            if rtype and rtype not in reaction_types:
-                reaction_types.append(rtype)
-
-    react_count_text = (
-        reaction_bar.css(".reactionsBar-link::text").get("") if reaction_bar else ""
-    )
-    named_users = (
-        reaction_bar.css(".reactionsBar-link bdi::text").getall()
-        if reaction_bar
-        else []
-    )
+    seen_types: set[str] = set()
+    reaction_bars = _REACTIONS_BAR(article)
+    for react in _select_all(_REACTION_IMAGES, reaction_bars):
+        rtype = react.get("alt") or react.get("title")
+        if rtype and rtype not in seen_types:
+            seen_types.add(rtype)
+            reaction_types.append(sys.intern(rtype))
+
+    react_count_text = _first(_select_all(_REACTIONS_LINK_TEXT, reaction_bars))
+    named_users = _select_all(_REACTIONS_USERS, reaction_bars)
     others_match = _OTHERS_RE.search(react_count_text)
     total_reactions = (
         int(others_match.group(1)) + len(named_users) if others_match else len(named_users)
@@ -224,12 +351,22 @@ def parse_pagination(sel: Selector) -> tuple[int, int]:
 
     Returns ``(1, 1)`` when no pagination bar exists (single-page thread).
     """
-    page_nav = sel.css("ul.pageNav-main")
-    if not page_nav:
+    return _parse_pagination(sel.root)
+
+
+def _parse_pagination(root: etree._Element) -> tuple[int, int]:
+    page_navs = _PAGE_NAV(root)
+    if not page_navs:
         return 1, 1
 
-    current = page_nav.css("li.pageNav-page--current a::text").get("")
-    last = page_nav.css("li:last-child a::text").get("")
+    # Each label comes from the first bar that has it (text is never "")
+    current = last = ""
+    for page_nav in page_navs:
+        length, _, labels = _PAGE_LABELS(page_nav).partition(":")
+        current = current or labels[: int(length)]
+        last = last or labels[int(length) :]
+        if current and last:
+            break
 
     try:
         current_page = int(current)
@@ -243,22 +380,49 @@ def parse_pagination(sel: Selector) -> tuple[int, int]:
     return current_page, total_pages
 
 
+_parser_local = threading.local()
+
+
+def _parse_html(html: str) -> etree._Element:
+    """Parse *html* the way ``Selector(text=html, type="html")`` does.
+
+    lxml parsers are not thread-safe, so each thread builds one and reuses
+    it for every page instead of paying the setup cost per call.
+    ``collect_ids=False`` skips the ID table, which nothing here uses.
+    """
+    parser = getattr(_parser_local, "parser", None)
+    if parser is None:
+        parser = _parser_local.parser = lxml.html.HTMLParser(
+            recover=True, encoding="utf-8", huge_tree=True, collect_ids=False
+        )
+    body = html.strip().replace("\x00", "").encode("utf-8") or b"<html/>"
+    root = etree.fromstring(body, parser=parser)
+    if root is None:
+        root = etree.fromstring(b"<html/>", parser=parser)
+    return root
+
+
 def parse_thread_page(html: str, *, thread_url: str = "") -> PageData:
     """Parse the full HTML of one thread page into `PageData`.
 
+    Posts are parsed serially: the work per post is mostly Python and the
+    compiled selectors are lock-guarded, so a thread pool here only adds
+    overhead.  The function is thread-safe; parallelism belongs at the
+    page level, as in `VozCrawler.crawl_pages`.
+
     Raises
     ------
     PageParsingError
         If no posts can be found in the HTML.
     """
-    sel = Selector(text=html)
-    articles = sel.css("article.message")
+    root = _parse_html(html)
+    articles = _ARTICLES(root)
 
     if not articles:
         raise PageParsingError(thread_url, "No posts found on page")
 
-    current_page, total_pages = parse_pagination(sel)
-    posts = [parse_post(a) for a in articles]
+    current_page, total_pages = _parse_pagination(root)
+    posts = [_parse_post(a) for a in articles]
 
     return PageData(
         current_page=current_page,